@@ -1,9 +1,12 @@
 # region imports
 from AlgorithmImports import *
 # endregion
+import numpy as np
 import pandas as pd
 from enum import Enum
 
+from swing_events import SwingEvents
+
 
 # === Новое: Enum для состояния диапазона ===
 class RangeState(str, Enum):
@@ -12,50 +15,67 @@ class RangeState(str, Enum):
     BROKEN = "Broken"    # пробит
 
 
+def find_swing_events(df: pd.DataFrame, window: int = 10) -> SwingEvents:
+    """Swing high / swing low как разреженные события (idx, kind, level, confirm_idx)."""
+    highs = df["High"].to_numpy(dtype=float)
+    lows = df["Low"].to_numpy(dtype=float)
+    n = len(df)
+    if n < 2 * window + 1:
+        return SwingEvents.from_tuples([], index=df.index)
+
+    # бар i — экстремум окна [i - window, i + window]
+    idx = np.arange(window, n - window)
+    is_high = highs[idx] == np.lib.stride_tricks.sliding_window_view(highs, 2 * window + 1).max(axis=1)
+    is_low = lows[idx] == np.lib.stride_tricks.sliding_window_view(lows, 2 * window + 1).min(axis=1)
+    events = [(i, 1, highs[i], i + window) for i in idx[is_high]]
+    events += [(i, -1, lows[i], i + window) for i in idx[is_low]]
+    return SwingEvents.from_tuples(events, index=df.index)
+
+
 def find_swings(df: pd.DataFrame, window: int = 10):
     """Определяет индексы swing high и swing low."""
-    highs, lows = [], []
-    for i in range(window, len(df) - window):
-        if df["High"].iloc[i] == max(df["High"].iloc[i - window:i + window + 1]):
-            highs.append(i)
-        if df["Low"].iloc[i] == min(df["Low"].iloc[i - window:i + window + 1]):
-            lows.append(i)
-    return highs, lows
+    events = find_swing_events(df, window)
+    return events.highs.idx.tolist(), events.lows.idx.tolist()
 
 
-def build_initial_range(df: pd.DataFrame, window: int = 10):
-    """Находит последний swing range и строит уровни Фибоначчи (-0.2 → 1.2)."""
-    highs, lows = find_swings(df, window)
-    if len(highs) == 0 or len(lows) == 0:
-        raise ValueError("Недостаточно swing high/low для построения диапазона")
-
-    last_high_idx = highs[-1]
-    last_low_idx = lows[-1]
+FIB_RATIOS = [-0.2, 0.0, 0.25, 0.5, 0.75, 1.0, 1.2]
 
-    if last_high_idx > last_low_idx:
-        high = df["High"].iloc[last_high_idx]
-        low = df["Low"].iloc[last_low_idx]
-        direction = "up"
-    else:
-        high = df["High"].iloc[last_low_idx]
-        low = df["Low"].iloc[last_high_idx]
-        direction = "down"
 
-    ratios = [-0.2, 0.0, 0.25, 0.5, 0.75, 1.0, 1.2]
+def fib_levels(high: float, low: float) -> dict:
+    """Уровни Фибоначчи (-0.2 → 1.2) между low и high."""
     diff = high - low
-    levels = {r: low + diff * r for r in ratios}
+    return {r: low + diff * r for r in FIB_RATIOS}
 
+
+def range_from_swings(high_idx: int, high: float, low_idx: int, low: float) -> dict:
+    """
+    Рендж из последних swing high / swing low — общий для build_initial_range
+    и побарного RangeTracker, чтобы алгоритм и бэктесты строили одно и то же.
+    Уровни — High swing high и Low swing low; порядок swing'ов задаёт только направление.
+    """
     return {
         "high": high,
         "low": low,
-        "levels": levels,
-        "direction": direction,
-        "high_idx": last_high_idx,
-        "low_idx": last_low_idx,
-        "state": RangeState.IDLE,   # новый флаг
+        "levels": fib_levels(high, low),
+        "direction": "up" if high_idx > low_idx else "down",
+        "high_idx": high_idx,
+        "low_idx": low_idx,
+        "state": RangeState.IDLE,
     }
 
 
+def build_initial_range(df: pd.DataFrame, window: int = 10, events: SwingEvents = None):
+    """Находит последний swing range и строит уровни Фибоначчи (-0.2 → 1.2)."""
+    if events is None:
+        events = find_swing_events(df, window)
+    last_high, last_low = events.last(1), events.last(-1)
+    if last_high is None or last_low is None:
+        raise ValueError("Недостаточно swing high/low для построения диапазона")
+
+    return range_from_swings(int(last_high["idx"]), last_high["level"],
+                             int(last_low["idx"]), last_low["level"])
+
+
 def update_fib_range(df: pd.DataFrame, last_range: dict, lookback: int = 20):
     """Проверяет разрушение или перестроение диапазона Фибоначчи."""
     high = last_range["high"]
@@ -87,8 +107,7 @@ def update_fib_range(df: pd.DataFrame, last_range: dict, lookback: int = 20):
                         window_df = df.iloc[i:j+1]
                         new_high = window_df["High"].max()
                         new_high_idx = window_df["High"].idxmax()
-                        diff = new_high - low
-                        new_levels = {r: low + diff * r for r in [-0.2, 0.0, 0.25, 0.5, 0.75, 1.0, 1.2]}
+                        new_levels = fib_levels(new_high, low)
                         new_range = {
                             "low": low,
                             "high": new_high,
@@ -106,8 +125,7 @@ def update_fib_range(df: pd.DataFrame, last_range: dict, lookback: int = 20):
                         window_df = df.iloc[i:j+1]
                         new_low = window_df["Low"].min()
                         new_low_idx = window_df["Low"].idxmin()
-                        diff = high - new_low
-                        new_levels = {r: high - diff * (1 - r) for r in [-0.2, 0.0, 0.25, 0.5, 0.75, 1.0, 1.2]}
+                        new_levels = fib_levels(high, new_low)
                         new_range = {
                             "low": new_low,
                             "high": high,
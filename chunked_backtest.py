@@ -0,0 +1,134 @@
+import queue
+import threading
+from typing import Callable, Iterable, Iterator, Optional, Sequence, Union
+
+import pandas as pd
+
+from entry_exit import EntryParams, ExitParams
+from incremental_range import RangeTracker
+from virtual_trader import VirtualTrader
+
+
+OHLC_COLUMNS = ["Open", "High", "Low", "Close"]
+
+
+def _normalize_columns(df: pd.DataFrame) -> pd.DataFrame:
+    # notebooks используют 'high'/'low'/'close', main.py — 'High'/'Low'/'Close'
+    return df.rename(columns={c: c.capitalize() for c in df.columns if c.capitalize() in OHLC_COLUMNS})
+
+
+def iter_bar_chunks(paths: Union[str, Sequence[str]], chunk_size: int = 100_000,
+                    **read_csv_kwargs) -> Iterator[pd.DataFrame]:
+    """
+    Читает минутные бары из одного или нескольких CSV кусками по chunk_size строк.
+
+    Файлы должны идти по времени (например, по одному на месяц/год).
+    В памяти одновременно лежит только текущий кусок.
+    """
+    if isinstance(paths, str):
+        paths = [paths]
+    # точный разбор float — иначе уровни чуть расходятся с расчётом в памяти
+    read_csv_kwargs.setdefault("float_precision", "round_trip")
+    for path in paths:
+        for chunk in pd.read_csv(path, chunksize=chunk_size, **read_csv_kwargs):
+            yield _normalize_columns(chunk)
+
+
+def prefetch(chunks: Iterable[pd.DataFrame], depth: int = 1) -> Iterator[pd.DataFrame]:
+    """
+    Читает следующий кусок в фоновом потоке, пока текущий обрабатывается.
+
+    depth — сколько кусков держать наготове; память ограничена (depth + 1) кусками.
+    """
+    q: "queue.Queue" = queue.Queue(maxsize=depth)
+    done = object()
+    stop = threading.Event()
+
+    def _reader():
+        try:
+            for chunk in chunks:
+                if stop.is_set():
+                    return
+                q.put(chunk)
+            q.put(done)
+        except BaseException as e:  # пробрасываем ошибку чтения в основной поток
+            q.put(e)
+
+    reader = threading.Thread(target=_reader, daemon=True)
+    reader.start()
+    try:
+        while True:
+            item = q.get()
+            if item is done:
+                return
+            if isinstance(item, BaseException):
+                raise item
+            yield item
+    finally:
+        stop.set()
+        # освобождаем место в очереди, чтобы поток не завис на put()
+        while reader.is_alive():
+            try:
+                q.get_nowait()
+            except queue.Empty:
+                reader.join(timeout=0.1)
+
+
+class StreamingBacktest:
+    """
+    Бэктест ренджевой стратегии, который получает бары кусками.
+
+    Всё состояние (swing'и, рендж, позиция) — побарное и переходит
+    между кусками, поэтому результат не зависит от разбиения:
+    run(iter_bar_chunks(...)) совпадает с run_in_memory(full_df).
+
+    Пробитые ренджи не копятся: их получает on_range, если он задан
+    (например, on_range=ranges.append для графиков).
+    """
+
+    def __init__(self, entry_params: Optional[EntryParams] = None,
+                 exit_params: Optional[ExitParams] = None,
+                 window: int = 10, lookback: int = 20,
+                 initial_equity: float = 100_000.0,
+                 on_range: Optional[Callable[[dict], None]] = None):
+        self.tracker = RangeTracker(window=window, lookback=lookback)
+        self.trader = VirtualTrader(
+            entry_params or EntryParams(small_buffer=1.0, use_limit=False),
+            exit_params or ExitParams(close_based=True, max_bars_in_trade=48),
+            initial_equity=initial_equity,
+        )
+        self.n_bars = 0
+        self.on_range = on_range  # получает каждый пробитый рендж
+
+    def process_chunk(self, df: pd.DataFrame):
+        df = _normalize_columns(df)
+        opens = df["Open"].to_numpy(dtype=float)
+        highs = df["High"].to_numpy(dtype=float)
+        lows = df["Low"].to_numpy(dtype=float)
+        closes = df["Close"].to_numpy(dtype=float)
+
+        tracker, trader = self.tracker, self.trader
+        for o, h, l, c in zip(opens, highs, lows, closes):
+            current_range, broken = tracker.update(self.n_bars, h, l, c)
+            if broken and self.on_range is not None:
+                self.on_range(current_range)
+            trader.on_bar(h, l, c, current_range, broken, o)
+            self.n_bars += 1
+
+    def run(self, chunks: Iterable[pd.DataFrame], prefetch_depth: int = 1) -> "StreamingBacktest":
+        source = prefetch(chunks, prefetch_depth) if prefetch_depth > 0 else chunks
+        for chunk in source:
+            self.process_chunk(chunk)
+        return self
+
+    def run_in_memory(self, df: pd.DataFrame) -> "StreamingBacktest":
+        self.process_chunk(df)
+        return self
+
+    @property
+    def trades(self):
+        return self.trader.trades
+
+    @property
+    def equity(self) -> float:
+        return self.trader.equity
@@ -0,0 +1,181 @@
+from typing import Iterable, Optional
+
+import numpy as np
+import pandas as pd
+import matplotlib.dates as mdates
+import matplotlib.pyplot as plt
+from matplotlib.collections import LineCollection
+
+from swing_events import SwingEvents
+
+
+FIB_COLORS = {-0.2: "red", 0.0: "green", 0.25: "gray", 0.5: "blue", 0.75: "gray", 1.0: "green", 1.2: "red"}
+
+
+def _ohlc_arrays(df: pd.DataFrame):
+    cols = {c.lower(): c for c in df.columns}
+    return tuple(df[cols[k]].to_numpy(dtype=float) for k in ("open", "high", "low", "close"))
+
+
+def _x_values(df: pd.DataFrame) -> np.ndarray:
+    if isinstance(df.index, pd.DatetimeIndex):
+        # то же, что date2num, но без конвертации каждой метки в datetime
+        epoch = np.datetime64(mdates.get_epoch(), "ns").astype(np.int64)
+        return (df.index.as_unit("ns").asi8 - epoch) / 86_400e9
+    return np.arange(len(df), dtype=float)
+
+
+def downsample_ohlc(x: np.ndarray, o: np.ndarray, h: np.ndarray, l: np.ndarray, c: np.ndarray,
+                    n_buckets: int):
+    """
+    Сжимает бары до n_buckets свечей без потери экстремумов:
+    open — первый, high — максимум, low — минимум, close — последний в корзине.
+    """
+    n = len(x)
+    if n <= n_buckets:
+        return x, o, h, l, c
+    starts = np.linspace(0, n, n_buckets, endpoint=False).astype(np.int64)
+    ends = np.r_[starts[1:], n] - 1
+    return (x[starts], o[starts],
+            np.maximum.reduceat(h, starts), np.minimum.reduceat(l, starts),
+            c[ends])
+
+
+def lttb(x: np.ndarray, y: np.ndarray, n_out: int):
+    """Largest-Triangle-Three-Buckets: n_out точек, визуально близких к исходной линии."""
+    n = len(x)
+    if n_out >= n or n_out < 3:
+        return x, y
+    edges = np.linspace(1, n - 1, n_out - 1).astype(np.int64)
+    idx = np.empty(n_out, dtype=np.int64)
+    idx[0], idx[-1] = 0, n - 1
+    a = 0
+    for i in range(n_out - 2):
+        lo, hi = edges[i], edges[i + 1]
+        # среднее следующей корзины (для последней — последняя точка)
+        nlo, nhi = hi, (edges[i + 2] if i + 2 < len(edges) else n)
+        avg_x, avg_y = x[nlo:nhi].mean(), y[nlo:nhi].mean()
+        area = np.abs((x[a] - avg_x) * (y[lo:hi] - y[a]) - (x[a] - x[lo:hi]) * (avg_y - y[a]))
+        a = lo + int(np.argmax(area))
+        idx[i + 1] = a
+    return x[idx], y[idx]
+
+
+def range_level_paths(ranges: Iterable[dict], x: np.ndarray) -> dict:
+    """
+    Отрезки уровней всех ренджей: {ratio: (xs, ys)}, отрезки разделены NaN,
+    так что каждый уровень рисуется одной линией, а не одним axhline на рендж.
+
+    Рендж — dict как у RangeTracker: "levels", "start_idx" (или high_idx/low_idx)
+    и "end_idx" (None — рендж ещё жив, тянем до последнего бара).
+    """
+    ranges = list(ranges)
+    last = len(x) - 1
+    starts = np.array([r["start_idx"] if r.get("start_idx") is not None
+                       else min(r["high_idx"], r["low_idx"]) for r in ranges], dtype=np.int64)
+    ends = np.array([last if r.get("end_idx") is None else r["end_idx"] for r in ranges], dtype=np.int64)
+    x0 = x[np.clip(starts, 0, last)]
+    x1 = x[np.clip(ends, 0, last)]
+    nan = np.full(len(ranges), np.nan)
+
+    paths = {}
+    for ratio in (ranges[0]["levels"] if ranges else {}):
+        y = np.array([r["levels"][ratio] for r in ranges], dtype=float)
+        paths[ratio] = (np.column_stack([x0, x1, nan]).ravel(), np.column_stack([y, y, nan]).ravel())
+    return paths
+
+
+def swing_points(swings, x: np.ndarray):
+    """(x, level) для swing high и swing low — из SwingEvents, dense-фрейма HighLow/Level или списка событий."""
+    if isinstance(swings, SwingEvents):
+        pos, kind, level = swings.idx, swings.kind, swings.level
+    elif isinstance(swings, pd.DataFrame):
+        hl = swings["HighLow"].to_numpy(dtype=float)
+        lvl = swings["Level"].to_numpy(dtype=float)
+        pos = np.flatnonzero(~np.isnan(hl))
+        kind, level = hl[pos], lvl[pos]
+    else:
+        ev = np.asarray([tuple(e)[:3] for e in swings], dtype=float).reshape(-1, 3)
+        pos, kind, level = ev[:, 0].astype(np.int64), ev[:, 1], ev[:, 2]
+    highs, lows = kind == 1, kind == -1
+    return (x[pos[highs]], level[highs]), (x[pos[lows]], level[lows])
+
+
+class FastRangeChart:
+    """
+    Быстрый график месяцев минутных баров с ренджами Фибоначчи.
+
+    Бары сжимаются до ширины оси в пикселях (OHLC-агрегация или LTTB для линии),
+    swing'и и уровни ренджей рисуются пакетно (одна линия на уровень Фибоначчи),
+    а при зуме видимый участок пересжимается заново.
+    """
+
+    def __init__(self, ohlc: pd.DataFrame, ranges: Optional[Iterable[dict]] = None,
+                 swings=None, ax=None, mode: str = "ohlc", title: Optional[str] = None):
+        self.x = _x_values(ohlc)
+        self.o, self.h, self.l, self.c = _ohlc_arrays(ohlc)
+        self.mode = mode
+        self.ax = ax if ax is not None else plt.subplots(figsize=(16, 8))[1]
+        self._updating = False
+
+        if mode == "ohlc":
+            self._wicks = LineCollection([], colors="black", linewidths=0.6)
+            self._bodies = LineCollection([], linewidths=2.0)
+            self.ax.add_collection(self._wicks)
+            self.ax.add_collection(self._bodies)
+        else:
+            (self._line,) = self.ax.plot([], [], color="black", linewidth=0.8, label="Close")
+
+        if ranges is not None:
+            for ratio, (xs, ys) in range_level_paths(ranges, self.x).items():
+                self.ax.plot(xs, ys, color=FIB_COLORS.get(ratio, "blue"), linestyle="dashed",
+                             linewidth=0.7, alpha=0.6)
+        if swings is not None:
+            (hx, hy), (lx, ly) = swing_points(swings, self.x)
+            self.ax.plot(hx, hy, "^", color="green", markersize=5, label="Swing High", zorder=3)
+            self.ax.plot(lx, ly, "v", color="red", markersize=5, label="Swing Low", zorder=3)
+
+        if isinstance(ohlc.index, pd.DatetimeIndex):
+            self.ax.xaxis_date()
+        if title:
+            self.ax.set_title(title)
+        self.ax.grid(alpha=0.3)
+
+        self.ax.set_xlim(self.x[0], self.x[-1])
+        self.redraw()
+        self.ax.callbacks.connect("xlim_changed", lambda ax: self.redraw())
+
+    def _pixel_width(self) -> int:
+        bbox = self.ax.get_window_extent()
+        return max(int(bbox.width), 100)
+
+    def redraw(self):
+        """Пересжимает видимый участок под текущую ширину оси."""
+        if self._updating:
+            return
+        self._updating = True
+        try:
+            x0, x1 = self.ax.get_xlim()
+            lo = max(int(np.searchsorted(self.x, x0, side="left")) - 1, 0)
+            hi = min(int(np.searchsorted(self.x, x1, side="right")) + 1, len(self.x))
+            sl = slice(lo, hi)
+            n_px = self._pixel_width()
+
+            if self.mode == "ohlc":
+                # одна свеча на ~2 пикселя
+                x, o, h, l, c = downsample_ohlc(self.x[sl], self.o[sl], self.h[sl], self.l[sl], self.c[sl],
+                                                max(n_px // 2, 1))
+                self._wicks.set_segments(np.stack([np.c_[x, l], np.c_[x, h]], axis=1))
+                self._bodies.set_segments(np.stack([np.c_[x, o], np.c_[x, c]], axis=1))
+                self._bodies.set_color(np.where(c >= o, "green", "red"))
+            else:
+                x, y = lttb(self.x[sl], self.c[sl], n_px)
+                self._line.set_data(x, y)
+
+            # масштаб по цене — по видимым барам
+            if hi > lo:
+                y0, y1 = np.nanmin(self.l[sl]), np.nanmax(self.h[sl])
+                pad = (y1 - y0) * 0.05 or 1.0
+                self.ax.set_ylim(y0 - pad, y1 + pad)
+        finally:
+            self._updating = False
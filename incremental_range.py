@@ -0,0 +1,168 @@
+from collections import deque
+from typing import List, Optional, Tuple
+
+from Range_rebuilder import RangeState, fib_levels, range_from_swings
+
+
+class SwingDetector:
+    """
+    Инкрементальный аналог find_swings: бар i — swing high, если его High
+    равен максимуму в окне [i - window, i + window]. Поэтому swing
+    подтверждается только через window баров и не перерисовывается.
+    """
+
+    def __init__(self, window: int = 10):
+        self.window = window
+        self._highs = deque(maxlen=2 * window + 1)
+        self._lows = deque(maxlen=2 * window + 1)
+        self.n_bars = 0
+
+    def update(self, high: float, low: float) -> List[Tuple[int, int, float, int]]:
+        """
+        Добавляет бар и возвращает подтверждённые swing'и: (idx, 1 | -1, level, confirm_idx) —
+        те же поля, что у swing_events.SWING_DTYPE.
+        """
+        self._highs.append(high)
+        self._lows.append(low)
+        bar_idx = self.n_bars
+        self.n_bars += 1
+
+        events = []
+        if len(self._highs) < self._highs.maxlen:
+            return events
+
+        idx = bar_idx - self.window
+        h = self._highs[self.window]
+        l = self._lows[self.window]
+        if h == max(self._highs):
+            events.append((idx, 1, h, bar_idx))
+        if l == min(self._lows):
+            events.append((idx, -1, l, bar_idx))
+        return events
+
+
+class RangeTracker:
+    """
+    Побарное состояние swing'ов и ренджа за O(1) на бар — для бэктестов и скринера.
+
+    Общее с путём main.py (range_worker → build_initial_range):
+    тот же поиск swing'ов, тот же рендж из последних swing'ов (range_from_swings),
+    те же правила пробоя (-0.2 / 1.2) и подтверждения (0.75 / 0.25 по закрытию),
+    после пробоя рендж не собирается заново из тех же swing'ов.
+
+    Отличия:
+    - перестроение после отката: здесь — причинное, откат начинается на первом
+      закрытии за 0.75 (0.25) и рендж перестраивается по экстремуму отката при
+      возврате в зону в пределах lookback баров; update_fib_range в main.py ищет
+      первый такой откат в снимке истории в фоне и применяется на следующем баре;
+    - swing'и здесь видны по всей истории, а main.py строит рендж по последним
+      range_history_bars барам.
+
+    Рендж хранится в формате build_initial_range,
+    плюс "range_id" (новый для каждого построения), "start_idx" и "end_idx".
+    """
+
+    def __init__(self, window: int = 10, lookback: int = 20):
+        self.swings = SwingDetector(window)
+        self.lookback = lookback
+        self.current_range: Optional[dict] = None
+        self.last_high: Optional[Tuple[int, float]] = None  # (idx, level) последнего swing high
+        self.last_low: Optional[Tuple[int, float]] = None
+        self.n_ranges = 0
+        self._last_anchor = -1     # последний swing, из которого уже строили рендж
+        self._dip_start = None     # начало отката для перестроения ренджа
+        self._dip_extreme = None   # (level, idx) экстремум внутри отката
+
+    @property
+    def state(self) -> RangeState:
+        return self.current_range["state"] if self.current_range is not None else RangeState.IDLE
+
+    def update(self, bar_idx: int, high: float, low: float, close: float) -> Tuple[Optional[dict], bool]:
+        """
+        Обрабатывает один бар.
+
+        Returns
+        -------
+        tuple[dict | None, bool]
+            Текущий рендж (или None) и флаг broken — рендж пробит на этом баре
+        """
+        for idx, kind, level, _ in self.swings.update(high, low):
+            if kind == 1:
+                self.last_high = (idx, level)
+            else:
+                self.last_low = (idx, level)
+
+        if self.current_range is None:
+            self._try_build(bar_idx)
+            return self.current_range, False
+
+        rng = self.current_range
+        levels = rng["levels"]
+        state = rng["state"]
+
+        # === Разрушение диапазона ===
+        if close > levels[1.2] or close < levels[-0.2]:
+            rng["state"] = RangeState.BROKEN
+            rng["end_idx"] = bar_idx
+            self.current_range = None
+            return rng, True
+
+        # === Подтверждение ренджа (bounce) ===
+        if state == RangeState.IDLE:
+            if rng["direction"] == "up" and close >= levels[0.75]:
+                rng["state"] = RangeState.TRADING
+            elif rng["direction"] == "down" and close <= levels[0.25]:
+                rng["state"] = RangeState.TRADING
+
+        # === Перестроение: откат от 0.75 (0.25) и возврат в течение lookback баров ===
+        elif state == RangeState.TRADING:
+            self._track_dip(bar_idx, high, low, close)
+
+        return self.current_range, False
+
+    def _try_build(self, bar_idx: int):
+        last_high, last_low = self.last_high, self.last_low
+        if last_high is None or last_low is None:
+            return
+        anchor = max(last_high[0], last_low[0])
+        # после пробоя ждём новый swing, иначе рендж соберётся из тех же точек
+        if anchor <= self._last_anchor:
+            return
+        self._last_anchor = anchor
+
+        self.n_ranges += 1
+        self.current_range = range_from_swings(last_high[0], last_high[1], last_low[0], last_low[1])
+        self.current_range.update(range_id=self.n_ranges, start_idx=bar_idx, end_idx=None)
+        self._dip_start = None
+
+    def _track_dip(self, bar_idx: int, high: float, low: float, close: float):
+        rng = self.current_range
+        up = rng["direction"] == "up"
+        zone = rng["levels"][0.75] if up else rng["levels"][0.25]
+        outside = close < zone if up else close > zone
+
+        if self._dip_start is None:
+            if outside:
+                self._dip_start = bar_idx
+                self._dip_extreme = (high if up else low, bar_idx)
+            return
+
+        if bar_idx - self._dip_start >= self.lookback:
+            self._dip_start = None
+            return
+
+        extreme, extreme_idx = self._dip_extreme
+        if (up and high > extreme) or (not up and low < extreme):
+            self._dip_extreme = (high if up else low, bar_idx)
+
+        if outside:
+            return
+
+        # вернулись в зону — перестраиваем рендж по экстремуму отката
+        extreme, extreme_idx = self._dip_extreme
+        if up:
+            rng["high"], rng["high_idx"] = extreme, extreme_idx
+        else:
+            rng["low"], rng["low_idx"] = extreme, extreme_idx
+        rng["levels"] = fib_levels(rng["high"], rng["low"])
+        self._dip_start = None
@@ -2,12 +2,14 @@
 from AlgorithmImports import *
 # endregion
 import pandas as pd
+from collections import deque
 from math import floor
 
 # === Импорты твоих модулей ===
 from swing_high_low_detection import find_swings
-from Fibonacci_Retracement import build_initial_range
-from Range_rebuilder import update_fib_range, RangeState
+from Range_rebuilder import RangeState
+from range_worker import BackgroundRangeBuilder
+from strategy_variants import VariantFanout
 from entry_exit import (
     make_long_signal, make_short_signal,
     decide_exit, EntryParams, ExitParams, Side
@@ -26,17 +28,42 @@ class CalculatingFluorescentOrangeCoyote(QCAlgorithm):
         self.symbol = self.AddCrypto("ETHUSDT", Resolution.MINUTE, Market.BYBIT).Symbol
 
         # === История и состояния ===
-        self.history_df = pd.DataFrame(columns=["Time", "Open", "High", "Low", "Close"])
+        # кольцевой буфер последних баров: память и время на бар не растут со временем работы
+        self.range_history_bars = 2000  # размер снимка истории для воркера
+        self.history = deque(maxlen=self.range_history_bars)
+        self.n_bars = 0
         self.current_range = None
         self.range_state = RangeState.IDLE
         self.position_side = None
         self.entry_price = None
         self.bars_in_trade = 0
+        self.trade_levels = None
+        self.trade_range_version = None
+        self.range_start = 0
+        self.range_anchor = -1  # последний swing, из которого уже строили рендж
+
+        # === Фоновое (пере)построение ренджа ===
+        self.range_builder = BackgroundRangeBuilder(window=10)
 
         # === Параметры стратегий ===
         self.entry_params = EntryParams(small_buffer=1.0, use_limit=False)
         self.exit_params = ExitParams(close_based=True, max_bars_in_trade=48)
 
+        # === Виртуальные варианты (A/B) на общем рендже; пустой dict — выключено ===
+        self.variants = VariantFanout({
+            "base": (self.entry_params, self.exit_params),
+            # на непрерывных 1m-барах Open(t+1) ≈ Close(t) с точностью до тиков, и любой порог
+            # в процентах почти не срабатывает — подтверждаем только направление open
+            "momentum": (EntryParams(small_buffer=1.0, confirm_momentum=True, min_momentum_pct=0.0),
+                         self.exit_params),
+            "short_hold": (self.entry_params, ExitParams(close_based=True, max_bars_in_trade=24)),
+            # small_buffer > 0: стоп ниже -0.2 (выше 1.2), и закрытие между ними — пробой ренджа.
+            # close_now вышел бы там же, где стоп base; widen_stop отодвигает стоп ещё на small_buffer
+            "widen_stop": (self.entry_params,
+                           ExitParams(close_based=True, max_bars_in_trade=48, small_buffer=2.0,
+                                      on_range_break="widen_stop")),
+        })
+
         # === Консолидация по минутам ===
         consolidator = TradeBarConsolidator(timedelta(minutes=1))
         self.SubscriptionManager.AddConsolidator(self.symbol, consolidator)
@@ -46,40 +73,91 @@ class CalculatingFluorescentOrangeCoyote(QCAlgorithm):
 
     # === Главный обработчик минутных баров ===
     def OnConsolidatedBar(self, sender, bar: TradeBar):
-        # Сохраняем бар в DataFrame
-        new_row = {
-            "Time": bar.EndTime,
-            "Open": bar.Open,
-            "High": bar.High,
-            "Low": bar.Low,
-            "Close": bar.Close
-        }
-        self.history_df.loc[len(self.history_df)] = new_row
+        # Сохраняем бар в кольцевой буфер
+        self.history.append((bar.EndTime, bar.Open, bar.High, bar.Low, bar.Close))
+        self.n_bars += 1
 
         # Достаточно данных для анализа?
-        if len(self.history_df) < 100:
+        if self.n_bars < 100:
             return
 
-        df = self.history_df.copy()
-
-        # === Построение / обновление ренджа ===
-        if self.current_range is None:
-            try:
-                self.current_range = build_initial_range(df, window=10)
-                self.range_state = self.current_range["state"]
+        # === Забираем готовый рендж из фонового воркера ===
+        # live: не блокируем; бэктест: ждём задание прошлого бара (одно построение),
+        # чтобы рендж применялся на фиксированном баре и бэктест был воспроизводим
+        ready = self.range_builder.poll(wait=not self.LiveMode)
+        if ready is not None:
+            kind, result = ready
+            # после пробоя ждём новый swing, иначе рендж соберётся из тех же точек
+            if kind == "build" and result is not None and self.current_range is None \
+                    and result["anchor"] > self.range_anchor:
+                self.range_anchor = result["anchor"]
+                self.current_range = result
+                self.range_state = result["state"]
+                self.range_start = self.n_bars - 1
+                self.current_range["range_id"] = self.range_builder.version
                 self.Debug(f"Initial range built: {self.current_range}")
-            except ValueError:
-                return
-        else:
-            updated_range, rebuild_idx, broken = update_fib_range(df, self.current_range)
-            self.current_range = updated_range
-            self.range_state = updated_range["state"]
-
-            if broken:
+            elif kind == "update" and self.current_range is not None:
+                updated_range, rebuild_idx, broken = result
+                if rebuild_idx is not None and not broken:
+                    updated_range["range_id"] = self.range_builder.version
+                    self.current_range = updated_range
+                    self.range_state = updated_range["state"]
+
+        # === Дешёвая проверка ренджа по закрытию бара ===
+        broken_range = None
+        if self.current_range is not None:
+            levels = self.current_range["levels"]
+            close = bar.Close
+            if close > levels[1.2] or close < levels[-0.2]:
                 self.Debug(f"Range broken at {bar.EndTime}. Rebuilding next.")
+                broken_range = self.current_range
+                broken_range["state"] = RangeState.BROKEN
                 self.current_range = None
-                self.range_state = RangeState.IDLE
-                return
+                self.range_state = RangeState.BROKEN
+                self.range_builder.invalidate()
+            elif self.range_state == RangeState.IDLE:
+                direction = self.current_range["direction"]
+                if (direction == "up" and close >= levels[0.75]) or (direction == "down" and close <= levels[0.25]):
+                    self.current_range["state"] = RangeState.TRADING
+                    self.range_state = RangeState.TRADING
+
+        # === (Пере)построение — только в фоне, по снимку последних баров ===
+        if not self.range_builder.busy:
+            if self.current_range is None:
+                self.range_builder.submit_build(self.HistorySnapshot())
+            elif self.range_state == RangeState.TRADING:
+                self.range_builder.submit_update(self.HistorySnapshot(self.range_start), self.current_range)
+
+        # === Варианты стратегии: тот же рендж, свои виртуальные позиции ===
+        if broken_range is not None:
+            self.variants.on_bar(bar.High, bar.Low, bar.Close, broken_range, True, bar.Open)
+        else:
+            self.variants.on_bar(bar.High, bar.Low, bar.Close, self.current_range, False, bar.Open)
+
+        # === Выход из сделки — на каждом баре, даже пока рендж перестраивается ===
+        if self.Portfolio.Invested and self.position_side is not None:
+            self.bars_in_trade += 1
+            # рендж сделки ещё жив — берём его уровни, иначе уровни на входе и BROKEN
+            same_range = self.current_range is not None and self.trade_range_version == self.range_builder.version
+            if same_range:
+                self.trade_levels = self.current_range["levels"]
+            exit_decision = decide_exit(
+                side=self.position_side,
+                close_price=bar.Close,
+                next_open_price=None,
+                levels=self.trade_levels,
+                bars_in_trade=self.bars_in_trade,
+                range_state=self.range_state if same_range else RangeState.BROKEN,
+                params=self.exit_params
+            )
+            if exit_decision.should_exit:
+                self.Liquidate(self.symbol)
+                self.Debug(f"Exit ({exit_decision.reason}) at {bar.Close}")
+                self.position_side = None
+                self.entry_price = None
+                self.trade_levels = None
+                self.bars_in_trade = 0
+            return
 
         # === Торговая логика ===
         if self.range_state == RangeState.TRADING:
@@ -96,6 +174,8 @@ class CalculatingFluorescentOrangeCoyote(QCAlgorithm):
                     if qty > 0:
                         self.MarketOrder(self.symbol, qty)
                         self.position_side = Side.LONG
+                        self.trade_levels = levels
+                        self.trade_range_version = self.range_builder.version
                         self.entry_price = long_signal.entry_price_hint
                         self.bars_in_trade = 0
                         self.Debug(f"Opened LONG at {self.entry_price} | SL {long_signal.stop_price} | TP {long_signal.tp_level}")
@@ -105,29 +185,18 @@ class CalculatingFluorescentOrangeCoyote(QCAlgorithm):
                     if qty > 0:
                         self.MarketOrder(self.symbol, -qty)
                         self.position_side = Side.SHORT
+                        self.trade_levels = levels
+                        self.trade_range_version = self.range_builder.version
                         self.entry_price = short_signal.entry_price_hint
                         self.bars_in_trade = 0
                         self.Debug(f"Opened SHORT at {self.entry_price} | SL {short_signal.stop_price} | TP {short_signal.tp_level}")
 
-            # === Выход из сделки ===
-            elif self.Portfolio.Invested:
-                self.bars_in_trade += 1
-                side = self.position_side
-                exit_decision = decide_exit(
-                    side=side,
-                    close_price=bar.Close,
-                    next_open_price=None,
-                    levels=levels,
-                    bars_in_trade=self.bars_in_trade,
-                    range_state=self.range_state,
-                    params=self.exit_params
-                )
-                if exit_decision.should_exit:
-                    self.Liquidate(self.symbol)
-                    self.Debug(f"Exit ({exit_decision.reason}) at {bar.Close}")
-                    self.position_side = None
-                    self.entry_price = None
-                    self.bars_in_trade = 0
+    # === Снимок буфера для воркера; индекс — сквозной номер бара ===
+    def HistorySnapshot(self, start=0):
+        first = self.n_bars - len(self.history)
+        df = pd.DataFrame(list(self.history), columns=["Time", "Open", "High", "Low", "Close"],
+                          index=range(first, self.n_bars))
+        return df.loc[max(start, first):]
 
     # === Расчёт размера позиции по 1%-правилу ===
     def CalculatePositionSize(self, entry_price, stop_price):
@@ -139,3 +208,12 @@ class CalculatingFluorescentOrangeCoyote(QCAlgorithm):
         qty = risk_amount / stop_distance
         lot_size = floor(qty)
         return max(lot_size, 0)
+
+    def OnEndOfAlgorithm(self):
+        self.range_builder.shutdown()
+        for name, stats in self.variants.summary().items():
+            self.Debug(f"Variant {name}: PnL {stats['pnl']:.2f} | trades {stats['trades']} | win rate {stats['win_rate']:.2%}")
+        for name in self.variants.idle_variants():
+            self.Debug(f"Warning: variant {name} made no trades")
+        for a, b in self.variants.identical_pairs():
+            self.Debug(f"Warning: variants {a} and {b} produced identical trades")
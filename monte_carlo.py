@@ -0,0 +1,229 @@
+import os
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+from typing import Dict, Iterable, Optional, Tuple
+
+import numpy as np
+
+
+# === Те же константы, что и в CalculatePositionSize (main.py) ===
+RISK_PER_TRADE = 0.01  # 1% риск на сделку
+
+
+@dataclass
+class TradeRecord:
+    """Одна закрытая сделка из бэктеста."""
+    side: str                            # "long" | "short" (значения Side)
+    entry_price: float
+    exit_price: float
+    stop_price: float
+    worst_price: Optional[float] = None  # худшее закрытие за время сделки (для пересчёта стопа)
+
+
+@dataclass
+class RobustnessReport:
+    """Распределения результатов по всем пересэмплированным путям."""
+    n_paths: int
+    method: str
+    ci: float
+    pnl_median: float
+    pnl_ci: Tuple[float, float]
+    max_drawdown_median: float
+    max_drawdown_ci: Tuple[float, float]
+    ruin_probability: float
+    baseline_pnl: float
+    baseline_max_drawdown: float
+    final_pnl: np.ndarray = field(repr=False)
+    max_drawdown: np.ndarray = field(repr=False)
+    ruined: np.ndarray = field(repr=False)
+
+
+def trades_to_arrays(trades: Iterable[TradeRecord]) -> Dict[str, np.ndarray]:
+    """Переводит список сделок в колонки numpy (sign = +1 для long, -1 для short)."""
+    trades = list(trades)
+    if not trades:
+        raise ValueError("Нет сделок для анализа")
+    sign = np.array([1.0 if str(getattr(t.side, "value", t.side)) == "long" else -1.0 for t in trades])
+    worst = np.array([np.nan if t.worst_price is None else t.worst_price for t in trades], dtype=float)
+    return {
+        "sign": sign,
+        "entry": np.array([t.entry_price for t in trades], dtype=float),
+        "exit": np.array([t.exit_price for t in trades], dtype=float),
+        "stop": np.array([t.stop_price for t in trades], dtype=float),
+        "worst": worst,
+    }
+
+
+# === Индексы сделок для каждого пути ===
+def _shuffle_indices(rng: np.random.Generator, n_paths: int, n_trades: int) -> np.ndarray:
+    base = np.broadcast_to(np.arange(n_trades), (n_paths, n_trades))
+    return rng.permuted(base, axis=1)
+
+
+def _block_bootstrap_indices(rng: np.random.Generator, n_paths: int, n_trades: int,
+                             block_size: int) -> np.ndarray:
+    # циклический блочный бутстрэп: сохраняет серии побед/поражений внутри блока
+    block_size = max(1, min(int(block_size), n_trades))
+    n_blocks = -(-n_trades // block_size)
+    starts = rng.integers(0, n_trades, size=(n_paths, n_blocks))
+    idx = (starts[:, :, None] + np.arange(block_size)) % n_trades
+    return idx.reshape(n_paths, n_blocks * block_size)[:, :n_trades]
+
+
+def _perturbed_trades(rng: np.random.Generator, arrays: Dict[str, np.ndarray], idx: np.ndarray,
+                      stop_jitter: float, buffer_jitter: float) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Возвращает (pnl на единицу, дистанция до стопа) размером (n_paths, n_trades).
+
+    Стоп close-based, поэтому пересчёт выхода идёт по худшему закрытию сделки
+    и только для сделок, где стоп стал ближе: если худшее закрытие пробило
+    новый стоп, сделка выходит по нему — в том числе сделки, выбитые исходным стопом.
+    Отодвинутый стоп меняет только размер позиции: что было бы после
+    исходного выхода, по списку сделок неизвестно, поэтому выход остаётся прежним.
+    """
+    sign = arrays["sign"][idx]
+    entry = arrays["entry"][idx]
+    exit_ = arrays["exit"][idx]
+    dist = base_dist = np.abs(entry - arrays["stop"][idx])
+
+    if stop_jitter > 0 or buffer_jitter > 0:
+        n_paths = idx.shape[0]
+        # один множитель стопа и один сдвиг small_buffer на путь — как другой конфиг стратегии
+        scale = rng.uniform(1.0 - stop_jitter, 1.0 + stop_jitter, size=(n_paths, 1))
+        shift = rng.uniform(-buffer_jitter, buffer_jitter, size=(n_paths, 1))
+        # стоп не заходит за цену входа; нулевая дистанция — позиция 0, как в CalculatePositionSize
+        dist = np.maximum(dist * scale + shift, 0.0)
+
+        # худшее закрытие пробило новый (более близкий) стоп — выход по нему
+        worst = arrays["worst"][idx]
+        new_stop = entry - sign * dist
+        hit = (dist < base_dist) & ~np.isnan(worst) & (sign * (worst - new_stop) < 0)
+        exit_ = np.where(hit, new_stop, exit_)
+
+    return sign * (exit_ - entry), dist
+
+
+def _equity_paths(pnl: np.ndarray, dist: np.ndarray, initial_equity: float,
+                  risk: float, ruin_equity: float) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Проходит сделки по порядку, все пути сразу; размер позиции по правилу 1%."""
+    n_paths, n_trades = pnl.shape
+    equity = np.full(n_paths, float(initial_equity))
+    peak = equity.copy()
+    max_dd = np.zeros(n_paths)
+    ruined = np.zeros(n_paths, dtype=bool)
+
+    for t in range(n_trades):
+        d = dist[:, t]
+        # нулевая дистанция до стопа — позиция 0, как в CalculatePositionSize
+        qty = np.floor(np.divide(np.maximum(equity, 0.0) * risk, d, out=np.zeros(n_paths), where=d > 0))
+        equity += qty * pnl[:, t]
+        np.maximum(peak, equity, out=peak)
+        np.maximum(max_dd, (peak - equity) / peak, out=max_dd)
+        ruined |= equity <= ruin_equity
+
+    return equity - initial_equity, max_dd, ruined
+
+
+def _simulate_chunk(arrays: Dict[str, np.ndarray], n_paths: int, method: str, block_size: int,
+                    stop_jitter: float, buffer_jitter: float, initial_equity: float,
+                    risk: float, ruin_equity: float,
+                    seed: np.random.SeedSequence) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    rng = np.random.default_rng(seed)
+    n_trades = len(arrays["sign"])
+    if method == "shuffle":
+        idx = _shuffle_indices(rng, n_paths, n_trades)
+    elif method == "bootstrap":
+        idx = _block_bootstrap_indices(rng, n_paths, n_trades, block_size)
+    else:
+        raise ValueError(f"Неизвестный метод: {method}")
+    pnl, dist = _perturbed_trades(rng, arrays, idx, stop_jitter, buffer_jitter)
+    return _equity_paths(pnl, dist, initial_equity, risk, ruin_equity)
+
+
+def run_robustness(
+    trades: Iterable[TradeRecord],
+    n_paths: int = 10_000,
+    method: str = "shuffle",
+    block_size: int = 5,
+    stop_jitter: float = 0.0,
+    buffer_jitter: float = 0.0,
+    initial_equity: float = 100_000.0,
+    risk: float = RISK_PER_TRADE,
+    ruin_fraction: float = 0.5,
+    ci: float = 0.95,
+    chunk_size: int = 10_000,
+    n_workers: Optional[int] = None,
+    seed: Optional[int] = None,
+) -> RobustnessReport:
+    """
+    Monte Carlo / bootstrap проверка устойчивости по списку сделок.
+
+    Parameters
+    ----------
+    trades : Iterable[TradeRecord]
+        Сделки из бэктеста в исходном порядке
+    n_paths : int
+        Количество путей (10k–100k)
+    method : str
+        "shuffle" — перестановка порядка сделок,
+        "bootstrap" — циклический блочный бутстрэп с блоком block_size
+    stop_jitter : float
+        Относительный разброс дистанции до стопа (0.1 → ±10%)
+    buffer_jitter : float
+        Абсолютный разброс small_buffer в единицах цены.
+        Выход пересчитывается только для приблизившихся стопов, см. _perturbed_trades
+    ruin_fraction : float
+        Разорение — капитал опустился до ruin_fraction * initial_equity
+    chunk_size : int
+        Путей на одну задачу пула процессов
+    n_workers : int
+        Размер пула; 1 — считать в текущем процессе
+
+    Returns
+    -------
+    RobustnessReport
+    """
+    arrays = trades_to_arrays(trades)
+    ruin_equity = initial_equity * ruin_fraction
+
+    # === Исходный порядок сделок — точка отсчёта ===
+    base_idx = np.arange(len(arrays["sign"]))[None, :]
+    base_pnl, base_dist = _perturbed_trades(np.random.default_rng(0), arrays, base_idx, 0.0, 0.0)
+    baseline_pnl, baseline_dd, _ = _equity_paths(base_pnl, base_dist, initial_equity, risk, ruin_equity)
+
+    # === Разбиваем пути на чанки, у каждого свой независимый seed ===
+    sizes = [min(chunk_size, n_paths - s) for s in range(0, n_paths, chunk_size)]
+    seeds = np.random.SeedSequence(seed).spawn(len(sizes))
+    args = [(arrays, n, method, block_size, stop_jitter, buffer_jitter,
+             initial_equity, risk, ruin_equity, s) for n, s in zip(sizes, seeds)]
+
+    n_workers = n_workers or min(len(sizes), os.cpu_count() or 1)
+    if n_workers <= 1 or len(sizes) == 1:
+        results = [_simulate_chunk(*a) for a in args]
+    else:
+        with ProcessPoolExecutor(max_workers=n_workers) as pool:
+            results = list(pool.map(_simulate_chunk, *zip(*args)))
+
+    final_pnl = np.concatenate([r[0] for r in results])
+    max_dd = np.concatenate([r[1] for r in results])
+    ruined = np.concatenate([r[2] for r in results])
+
+    q = [(1.0 - ci) / 2.0 * 100.0, (1.0 + ci) / 2.0 * 100.0]
+    pnl_lo, pnl_hi = np.percentile(final_pnl, q)
+    dd_lo, dd_hi = np.percentile(max_dd, q)
+
+    return RobustnessReport(
+        n_paths=int(n_paths),
+        method=method,
+        ci=ci,
+        pnl_median=float(np.median(final_pnl)),
+        pnl_ci=(float(pnl_lo), float(pnl_hi)),
+        max_drawdown_median=float(np.median(max_dd)),
+        max_drawdown_ci=(float(dd_lo), float(dd_hi)),
+        ruin_probability=float(ruined.mean()),
+        baseline_pnl=float(baseline_pnl[0]),
+        baseline_max_drawdown=float(baseline_dd[0]),
+        final_pnl=final_pnl,
+        max_drawdown=max_dd,
+        ruined=ruined,
+    )
@@ -2,13 +2,15 @@ from collections import deque
 import pandas as pd
 import numpy as np
 
+from swing_events import SwingEvents
+
 def swing_highs_lows_online(
     ohlc: pd.DataFrame,
     N_candidates: list = [5, 10, 20, 50],
     N_confirmation: int = 3,
     min_move_threshold: float = 0.0,
     min_bars_between_swings: int = 3
-) -> pd.DataFrame:
+) -> SwingEvents:
     """
     Online swing high/low detection with confirmation (no repainting).
 
@@ -22,12 +24,12 @@ def swing_highs_lows_online(
 
     Returns:
     --------
-    pd.DataFrame with columns:
-        'HighLow' : 1 for swing high, -1 for swing low, NaN otherwise
-        'Level'   : price level of the swing
+    SwingEvents - one record per swing: (idx, kind, level, confirm_idx),
+        kind is 1 for swing high, -1 for swing low.
+        .to_frame() gives the old dense 'HighLow' / 'Level' frame.
     """
     
-    swings = pd.DataFrame(index=ohlc.index, columns=["HighLow", "Level"], dtype=float)
+    swings = {}  # idx -> (idx, kind, level, confirm_idx); later windows overwrite
     last_swing_index = -min_bars_between_swings - 1  # initialize for spacing
     
     # For each candidate window size
@@ -63,15 +65,77 @@ def swing_highs_lows_online(
             if candidate_close == max(window_values):
                 # optional min_move_threshold check
                 if min_move_threshold == 0 or (candidate_close - min(window_values)) / candidate_close >= min_move_threshold:
-                    swings.at[ohlc.index[idx], "HighLow"] = 1
-                    swings.at[ohlc.index[idx], "Level"] = highs[idx]
+                    swings[idx] = (idx, 1, highs[idx], i)
                     last_swing_index = idx
             
             # check swing low
             elif candidate_close == min(window_values):
                 if min_move_threshold == 0 or (max(window_values) - candidate_close) / candidate_close >= min_move_threshold:
-                    swings.at[ohlc.index[idx], "HighLow"] = -1
-                    swings.at[ohlc.index[idx], "Level"] = lows[idx]
+                    swings[idx] = (idx, -1, lows[idx], i)
                     last_swing_index = idx
                     
-    return swings
+    return SwingEvents.from_tuples(swings.values(), index=ohlc.index)
+
+
+
+def swing_highs_lows(ohlc: pd.DataFrame, swing_length: int = 50) -> SwingEvents:
+    """
+    Centered-window swing detection from the research notebook, on sparse positions.
+
+    Same result as the notebook version (consecutive highs/lows reduced to the
+    most extreme one, first/last bar marked with the opposite swing), but only
+    the swing positions are kept instead of a NaN-filled column.
+    """
+    swing_length *= 2
+    half = swing_length // 2
+    highs = ohlc["high"].to_numpy(dtype=float)
+    lows = ohlc["low"].to_numpy(dtype=float)
+    n = len(ohlc)
+
+    # high[i] == max(high[i - swing_length + 1 + half : i + half + 1]), bars with a full window only
+    pos = np.arange(swing_length - 1, n - half)
+    if len(pos) > 0:
+        win_max = np.lib.stride_tricks.sliding_window_view(highs, swing_length).max(axis=1)
+        win_min = np.lib.stride_tricks.sliding_window_view(lows, swing_length).min(axis=1)
+        j = pos - swing_length + 1 + half
+        is_high = highs[pos] == win_max[j]
+        is_low = ~is_high & (lows[pos] == win_min[j])
+        kind = np.where(is_high, 1, -1)[is_high | is_low]
+        pos = pos[is_high | is_low]
+    else:
+        kind = np.empty(0, dtype=np.int64)
+
+    # consecutive swings of the same type: keep only the more extreme one
+    while len(pos) >= 2:
+        current, nxt = kind[:-1], kind[1:]
+        h, next_h = highs[pos[:-1]], highs[pos[1:]]
+        l, next_l = lows[pos[:-1]], lows[pos[1:]]
+
+        remove = np.zeros(len(pos), dtype=bool)
+        consecutive_highs = (current == 1) & (nxt == 1)
+        remove[:-1] |= consecutive_highs & (h < next_h)
+        remove[1:] |= consecutive_highs & (h >= next_h)
+        consecutive_lows = (current == -1) & (nxt == -1)
+        remove[:-1] |= consecutive_lows & (l > next_l)
+        remove[1:] |= consecutive_lows & (l <= next_l)
+
+        if not remove.any():
+            break
+        pos, kind = pos[~remove], kind[~remove]
+
+    kinds = dict(zip(pos.tolist(), kind.tolist()))
+    if len(pos) > 0:
+        first, last = int(pos[0]), int(pos[-1])
+        if kinds[first] == 1:
+            kinds[0] = -1
+        if kinds[first] == -1:
+            kinds[0] = 1
+        if kinds.get(last) == -1:
+            kinds[n - 1] = 1
+        if kinds.get(last) == 1:
+            kinds[n - 1] = -1
+
+    return SwingEvents.from_tuples(
+        ((i, k, highs[i] if k == 1 else lows[i], min(i + half, n - 1)) for i, k in kinds.items()),
+        index=ohlc.index,
+    )
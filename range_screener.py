@@ -0,0 +1,177 @@
+import io
+import os
+from concurrent.futures import ProcessPoolExecutor, wait
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, List, Optional
+
+import pandas as pd
+
+from Range_rebuilder import RangeState
+from incremental_range import RangeTracker
+
+
+@dataclass
+class SymbolState:
+    """Инкрементальное состояние одного символа между сканами."""
+    tracker: RangeTracker
+    last_time: Optional[pd.Timestamp] = None
+    last_close: Optional[float] = None
+    cursor: Any = None            # позиция в хранилище баров (см. CsvBarStore)
+    error: Optional[str] = None   # ошибка последнего обновления символа
+
+
+class CsvBarStore:
+    """
+    Локальное хранилище баров: один CSV на символ ({root}/{symbol}.csv)
+    с колонками Time, Open, High, Low, Close, дописывается в конец.
+
+    Курсор — (заголовок, байтовое смещение): каждый скан читает только
+    дописанные с прошлого раза полные строки. Первое чтение берёт
+    последние warmup_bytes файла — трекеру хватает недавней истории.
+    """
+
+    def __init__(self, root: str, warmup_bytes: int = 4_000_000):
+        self.root = root
+        self.warmup_bytes = warmup_bytes
+
+    def __call__(self, symbol: str, cursor):
+        with open(os.path.join(self.root, f"{symbol}.csv"), "rb") as f:
+            if cursor is None:
+                header = f.readline()
+                size = os.fstat(f.fileno()).st_size
+                start = max(f.tell(), size - self.warmup_bytes)
+                if start > f.tell():
+                    f.seek(start - 1)
+                    f.readline()  # дочитываем оборванную строку
+            else:
+                header, offset = cursor
+                f.seek(offset)
+            start = f.tell()
+            data = f.read()
+
+        # последняя строка может быть ещё не дописана — её берём в следующий раз
+        end = data.rfind(b"\n") + 1
+        if end == 0:
+            return None, (header, start)
+        bars = pd.read_csv(io.BytesIO(header + data[:end]), parse_dates=["Time"])
+        return bars, (header, start + end)
+
+
+def _zone_distance(close: float, levels: dict):
+    """Расстояние до зон входа в долях ширины ренджа: 0 — цена внутри зоны."""
+    width = levels[1.0] - levels[0.0]
+    if width <= 0:
+        return None, None
+    r = (close - levels[0.0]) / width
+    long_dist = max(0.0, r - 0.25, -r)        # зона make_long_signal: 0–0.25
+    short_dist = max(0.0, 0.75 - r, r - 1.0)  # зона make_short_signal: 0.75–1.0
+    return ("long", long_dist) if long_dist <= short_dist else ("short", short_dist)
+
+
+def _update_shard(states: Dict[str, SymbolState], load_bars: Callable) -> Dict[str, SymbolState]:
+    """Докидывает новые бары в трекеры символов шарда (выполняется в воркере)."""
+    for symbol, st in states.items():
+        # ошибка одного символа (нет файла, битая строка) не должна ронять весь шард
+        try:
+            bars, cursor = load_bars(symbol, st.cursor)
+            if bars is not None and len(bars) > 0:
+                tracker = st.tracker
+                for h, l, c in zip(bars["High"].to_numpy(dtype=float),
+                                   bars["Low"].to_numpy(dtype=float),
+                                   bars["Close"].to_numpy(dtype=float)):
+                    tracker.update(tracker.swings.n_bars, h, l, c)
+                st.last_time = bars["Time"].iloc[-1]
+                st.last_close = float(bars["Close"].iloc[-1])
+            st.cursor = cursor
+            st.error = None
+        except Exception as e:
+            st.error = f"{type(e).__name__}: {e}"
+    return states
+
+
+class RangeScreener:
+    """
+    Скринер по всей вселенной символов: какие пары сейчас в TRADING-рендже
+    и насколько цена близка к зонам 0–0.25 / 0.75–1.0.
+
+    Символы разбиты на шарды, шарды обновляются параллельно в пуле процессов.
+    scan() ждёт не дольше latency_budget секунд: шарды, которые не успели,
+    отдаются по прошлому состоянию (stale=True) и забираются на следующем скане.
+
+    load_bars(symbol, cursor) -> (bars, cursor) отдаёт только новые бары.
+    Символы с ошибкой обновления в рейтинг не попадают, см. errors.
+    """
+
+    def __init__(self, symbols: List[str], load_bars: Callable,
+                 window: int = 10, lookback: int = 20,
+                 shard_size: int = 25, n_workers: Optional[int] = None,
+                 latency_budget: float = 5.0, max_distance: float = 0.1):
+        self.load_bars = load_bars
+        self.latency_budget = latency_budget
+        self.max_distance = max_distance
+        self.shards: List[Dict[str, SymbolState]] = [
+            {s: SymbolState(RangeTracker(window=window, lookback=lookback))
+             for s in symbols[i:i + shard_size]}
+            for i in range(0, len(symbols), shard_size)
+        ]
+        self._pool = ProcessPoolExecutor(max_workers=n_workers or os.cpu_count())
+        self._pending: Dict[int, object] = {}  # номер шарда -> future
+
+    def scan(self) -> pd.DataFrame:
+        for i, shard in enumerate(self.shards):
+            if i not in self._pending:
+                self._pending[i] = self._pool.submit(_update_shard, shard, self.load_bars)
+
+        wait(list(self._pending.values()), timeout=self.latency_budget)
+
+        stale = set()
+        for i, fut in list(self._pending.items()):
+            if not fut.done():
+                stale.add(i)
+                continue
+            del self._pending[i]
+            try:
+                self.shards[i] = fut.result()
+            except Exception as e:  # упал весь воркер — шард остаётся со старым состоянием
+                stale.add(i)
+                for st in self.shards[i].values():
+                    st.error = f"{type(e).__name__}: {e}"
+
+        return self._rank(stale)
+
+    def _rank(self, stale: set) -> pd.DataFrame:
+        rows = []
+        for i, shard in enumerate(self.shards):
+            for symbol, st in shard.items():
+                rng = st.tracker.current_range
+                if st.error is not None or rng is None or rng["state"] != RangeState.TRADING or st.last_close is None:
+                    continue
+                side, dist = _zone_distance(st.last_close, rng["levels"])
+                if side is None or dist > self.max_distance:
+                    continue
+                rows.append({
+                    "symbol": symbol,
+                    "side": side,
+                    "distance": dist,
+                    "width_pct": (rng["high"] - rng["low"]) / st.last_close * 100.0,
+                    "age_bars": st.tracker.swings.n_bars - 1 - rng["start_idx"],
+                    "close": st.last_close,
+                    "time": st.last_time,
+                    "stale": i in stale,
+                })
+
+        columns = ["symbol", "side", "distance", "width_pct", "age_bars", "close", "time", "stale"]
+        if not rows:
+            return pd.DataFrame(columns=columns)
+        # ближе к зоне — выше; при равенстве — шире и старше рендж
+        return (pd.DataFrame(rows, columns=columns)
+                .sort_values(["distance", "width_pct", "age_bars"], ascending=[True, False, False])
+                .reset_index(drop=True))
+
+    @property
+    def errors(self) -> Dict[str, str]:
+        """Символы, которые не удалось обновить на последнем скане."""
+        return {s: st.error for shard in self.shards for s, st in shard.items() if st.error is not None}
+
+    def close(self):
+        self._pool.shutdown(wait=True, cancel_futures=True)
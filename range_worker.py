@@ -0,0 +1,77 @@
+import copy
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional, Tuple
+
+import pandas as pd
+
+from Range_rebuilder import build_initial_range, update_fib_range
+
+
+def _build_job(snapshot: pd.DataFrame, window: int):
+    try:
+        result = build_initial_range(snapshot, window=window)
+    except ValueError:
+        return "build", None
+    # последний swing ренджа в сквозной нумерации баров — чтобы не собирать рендж из тех же точек
+    result["anchor"] = snapshot.index[max(result["high_idx"], result["low_idx"])]
+    return "build", result
+
+
+def _update_job(snapshot: pd.DataFrame, last_range: dict, lookback: int):
+    return "update", update_fib_range(snapshot, last_range, lookback=lookback)
+
+
+class BackgroundRangeBuilder:
+    """
+    Строит / перестраивает рендж в фоновом потоке, чтобы OnConsolidatedBar не ждал.
+
+    Каждое задание получает неизменяемый снимок истории и номер версии.
+    poll() возвращает готовый результат только если его версия совпадает
+    с текущей — результаты по уже пробитому ренджу выбрасываются.
+    В live poll() не блокирует; в бэктесте poll(wait=True) дожидается задания,
+    чтобы рендж всегда применялся на следующем баре и результат был воспроизводим.
+    """
+
+    def __init__(self, window: int = 10, lookback: int = 20):
+        self.window = window
+        self.lookback = lookback
+        self.version = 0
+        self._executor = ThreadPoolExecutor(max_workers=1)
+        self._future = None
+        self._future_version = None
+
+    @property
+    def busy(self) -> bool:
+        return self._future is not None
+
+    def invalidate(self):
+        """Рендж сменился (пробой) — всё, что сейчас считается, уже неактуально."""
+        self.version += 1
+
+    def submit_build(self, snapshot: pd.DataFrame) -> bool:
+        if self.busy:
+            return False
+        self._future = self._executor.submit(_build_job, snapshot, self.window)
+        self._future_version = self.version
+        return True
+
+    def submit_update(self, snapshot: pd.DataFrame, last_range: dict) -> bool:
+        if self.busy:
+            return False
+        # update_fib_range меняет dict на месте — отдаём воркеру копию
+        self._future = self._executor.submit(_update_job, snapshot, copy.deepcopy(last_range), self.lookback)
+        self._future_version = self.version
+        return True
+
+    def poll(self, wait: bool = False) -> Optional[Tuple[str, object]]:
+        if self._future is None or (not wait and not self._future.done()):
+            return None
+        future, version = self._future, self._future_version
+        self._future = None
+        self._future_version = None
+        if version != self.version:
+            return None
+        return future.result()
+
+    def shutdown(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,52 @@
+from typing import Dict, List, Optional, Tuple
+
+from entry_exit import EntryParams, ExitParams
+from virtual_trader import VirtualTrader
+
+
+class VariantFanout:
+    """
+    Несколько конфигураций EntryParams / ExitParams на одном потоке баров.
+
+    Буфер баров, swing'и и рендж считаются один раз в алгоритме; каждый
+    вариант получает тот же рендж и ведёт свою виртуальную позицию и PnL,
+    так что цена ещё одного варианта — только его проверки сигналов.
+    """
+
+    def __init__(self, variants: Dict[str, Tuple[EntryParams, ExitParams]],
+                 initial_equity: float = 100_000.0):
+        self.initial_equity = initial_equity
+        self.traders: Dict[str, VirtualTrader] = {
+            name: VirtualTrader(entry, exit_, initial_equity=initial_equity)
+            for name, (entry, exit_) in variants.items()
+        }
+
+    def on_bar(self, high: float, low: float, close: float,
+               current_range: Optional[dict], broken: bool = False,
+               open_price: Optional[float] = None):
+        for trader in self.traders.values():
+            trader.on_bar(high, low, close, current_range, broken, open_price)
+
+    def idle_variants(self) -> List[str]:
+        """Варианты без единой сделки — сравнивать их не с чем."""
+        return [name for name, trader in self.traders.items() if not trader.trades]
+
+    def identical_pairs(self) -> List[Tuple[str, str]]:
+        """Пары вариантов с одинаковыми сделками — такое A/B ничего не сравнивает."""
+        names = [n for n, t in self.traders.items() if t.trades]
+        return [(a, b) for i, a in enumerate(names) for b in names[i + 1:]
+                if self.traders[a].trades == self.traders[b].trades]
+
+    def summary(self) -> Dict[str, dict]:
+        result = {}
+        for name, trader in self.traders.items():
+            wins = sum(1 for t in trader.trades
+                       if (t.exit_price - t.entry_price) * (1 if t.side == "long" else -1) > 0)
+            n = len(trader.trades)
+            result[name] = {
+                "pnl": trader.equity - self.initial_equity,
+                "trades": n,
+                "win_rate": wins / n if n else 0.0,
+                "invested": trader.invested,
+            }
+        return result
@@ -0,0 +1,83 @@
+from typing import Iterable, Optional
+
+import numpy as np
+import pandas as pd
+
+
+# === Одна запись на swing вместо плотного фрейма с NaN на каждом баре ===
+SWING_DTYPE = np.dtype([
+    ("idx", np.int64),          # позиция бара swing'а
+    ("kind", np.int8),          # 1 — swing high, -1 — swing low
+    ("level", np.float64),      # уровень (High для high, Low для low)
+    ("confirm_idx", np.int64),  # бар, на котором swing стал известен
+])
+
+
+class SwingEvents:
+    """
+    Разреженный список swing'ов, отсортированный по idx.
+
+    to_frame() лениво строит старый плотный вид (колонки HighLow / Level
+    по всему индексу ohlc) — только если он действительно нужен.
+    """
+
+    def __init__(self, records: np.ndarray, index: Optional[pd.Index] = None,
+                 n_bars: Optional[int] = None):
+        self.records = np.sort(np.asarray(records, dtype=SWING_DTYPE), order="idx", kind="stable")
+        self.index = index
+        self.n_bars = n_bars if n_bars is not None else (len(index) if index is not None else None)
+        self._frame = None
+
+    @classmethod
+    def from_tuples(cls, events: Iterable[tuple], index: Optional[pd.Index] = None,
+                    n_bars: Optional[int] = None) -> "SwingEvents":
+        """Из кортежей (idx, kind, level, confirm_idx) — как их отдаёт SwingDetector.update."""
+        return cls(np.array(list(events), dtype=SWING_DTYPE), index, n_bars)
+
+    def __len__(self) -> int:
+        return len(self.records)
+
+    def __iter__(self):
+        return (tuple(r) for r in self.records.tolist())
+
+    @property
+    def idx(self) -> np.ndarray:
+        return self.records["idx"]
+
+    @property
+    def kind(self) -> np.ndarray:
+        return self.records["kind"]
+
+    @property
+    def level(self) -> np.ndarray:
+        return self.records["level"]
+
+    @property
+    def confirm_idx(self) -> np.ndarray:
+        return self.records["confirm_idx"]
+
+    @property
+    def highs(self) -> "SwingEvents":
+        return SwingEvents(self.records[self.kind == 1], self.index, self.n_bars)
+
+    @property
+    def lows(self) -> "SwingEvents":
+        return SwingEvents(self.records[self.kind == -1], self.index, self.n_bars)
+
+    def last(self, kind: int):
+        """Последний swing данного типа (запись SWING_DTYPE) или None."""
+        pos = np.flatnonzero(self.kind == kind)
+        return self.records[pos[-1]] if len(pos) else None
+
+    def to_frame(self) -> pd.DataFrame:
+        """Плотный вид HighLow / Level (NaN на барах без swing'а), кэшируется."""
+        if self._frame is None:
+            if self.n_bars is None:
+                raise ValueError("Для плотного вида нужен index или n_bars")
+            hl = np.full(self.n_bars, np.nan)
+            level = np.full(self.n_bars, np.nan)
+            hl[self.idx] = self.kind
+            level[self.idx] = self.level
+            self._frame = pd.DataFrame({"HighLow": hl, "Level": level},
+                                       index=self.index if self.index is not None else None)
+        return self._frame
@@ -0,0 +1,150 @@
+from math import floor
+from typing import List, Optional
+
+from entry_exit import (
+    make_long_signal, make_short_signal,
+    decide_exit, EntryParams, ExitParams, ExitReason, Side
+)
+from Range_rebuilder import RangeState
+from monte_carlo import TradeRecord, RISK_PER_TRADE
+
+
+class VirtualTrader:
+    """
+    Виртуальная позиция по тем же правилам, что и OnConsolidatedBar:
+    вход по make_long_signal / make_short_signal в TRADING-рендже,
+    выход по decide_exit, размер позиции по правилу 1% от капитала.
+    """
+
+    def __init__(self, entry_params: EntryParams, exit_params: ExitParams,
+                 initial_equity: float = 100_000.0, risk: float = RISK_PER_TRADE):
+        self.entry_params = entry_params
+        self.exit_params = exit_params
+        self.risk = risk
+        self.equity = float(initial_equity)
+        self.trades: List[TradeRecord] = []
+
+        self.side: Optional[Side] = None
+        self.qty = 0
+        self.entry_price = None
+        self.stop_price = None
+        self.worst_price = None
+        self.stop_override = None  # стоп из ExitDecision.new_stop (on_range_break="widen_stop")
+        self.bars_in_trade = 0
+        self._levels = None
+        self._range_id = None
+        self._prev = None  # (close, range) прошлого бара для confirm_momentum
+
+    @property
+    def invested(self) -> bool:
+        return self.side is not None
+
+    def on_bar(self, high: float, low: float, close: float,
+               current_range: Optional[dict], broken: bool = False,
+               open_price: Optional[float] = None):
+        """Один бар: выход по открытой позиции или поиск входа."""
+        prev, self._prev = self._prev, None
+        if self.invested:
+            self._check_exit(high, low, close, current_range, broken)
+            return
+
+        # confirm_momentum: сигнал прошлого бара подтверждается open текущего
+        if self.entry_params.confirm_momentum and open_price is not None:
+            if prev is not None:
+                self._try_enter(prev[0], open_price, prev[1], close)
+            if not self.invested and current_range is not None and not broken:
+                self._prev = (close, current_range)
+            return
+
+        self._try_enter(close, None, current_range if not broken else None, close)
+
+    def _try_enter(self, close: float, next_open: Optional[float],
+                   current_range: Optional[dict], last_price: float):
+        if current_range is None or current_range["state"] != RangeState.TRADING:
+            return
+        levels = current_range["levels"]
+        signal = (make_long_signal(close, next_open, levels, self.entry_params, current_range["state"])
+                  or make_short_signal(close, next_open, levels, self.entry_params, current_range["state"]))
+        if signal is None:
+            return
+
+        qty = self.position_size(signal.entry_price_hint, signal.stop_price)
+        if qty <= 0:
+            return
+        self.side = signal.side
+        self.qty = qty
+        self.entry_price = signal.entry_price_hint
+        self.stop_price = signal.stop_price
+        self.worst_price = last_price
+        self.bars_in_trade = 0
+        self._levels = levels
+        self._range_id = current_range["range_id"]
+
+    def _check_exit(self, high: float, low: float, close: float,
+                    current_range: Optional[dict], broken: bool):
+        self.bars_in_trade += 1
+        # стоп close-based — значит и худшая цена считается по закрытиям
+        self.worst_price = min(self.worst_price, close) if self.side == Side.LONG else max(self.worst_price, close)
+
+        # пока рендж сделки жив — берём его актуальные уровни, иначе уровни на входе и BROKEN
+        same_range = current_range is not None and current_range["range_id"] == self._range_id
+        if same_range:
+            self._levels = current_range["levels"]
+        range_state = current_range["state"] if same_range else RangeState.BROKEN
+
+        decision = decide_exit(
+            side=self.side,
+            close_price=close,
+            next_open_price=None,
+            levels=self._levels,
+            bars_in_trade=self.bars_in_trade,
+            range_state=range_state,
+            params=self.exit_params
+        )
+        if self.stop_override is not None:
+            # после widen_stop позицию ведёт сдвинутый стоп, а не стоп / пробой по уровням
+            sign = 1.0 if self.side == Side.LONG else -1.0
+            timeout = (self.exit_params.max_bars_in_trade is not None
+                       and self.bars_in_trade >= int(self.exit_params.max_bars_in_trade))
+            if sign * (close - self.stop_override) < 0 or timeout:
+                self._close(close)
+            elif decision.should_exit and decision.reason == ExitReason.TAKE_PROFIT:
+                self._close(decision.exit_price_hint)
+            return
+
+        if decision.should_exit:
+            self._close(decision.exit_price_hint)
+        elif decision.new_stop is not None:
+            self.stop_override = self._widened_stop(decision.new_stop, decision.meta["stop_level"])
+
+    def _widened_stop(self, new_stop: float, stop_level: float) -> float:
+        """
+        Стоп после widen_stop: текущий стоп (по уровням или на входе — что дальше),
+        отодвинутый ещё на small_buffer. new_stop из decide_exit берётся, только если он дальше.
+        """
+        sign = 1.0 if self.side == Side.LONG else -1.0
+        current = min(sign * stop_level, sign * self.stop_price) * sign
+        widened = current - sign * self.exit_params.small_buffer
+        return float(new_stop) if sign * (new_stop - widened) < 0 else widened
+
+    def _close(self, exit_price: float):
+        sign = 1.0 if self.side == Side.LONG else -1.0
+        self.equity += self.qty * sign * (exit_price - self.entry_price)
+        self.trades.append(TradeRecord(self.side.value, float(self.entry_price), float(exit_price),
+                                       float(self.stop_price), float(self.worst_price)))
+        self.side = None
+        self.qty = 0
+        self.entry_price = None
+        self.stop_price = None
+        self.worst_price = None
+        self.stop_override = None
+        self.bars_in_trade = 0
+        self._levels = None
+        self._range_id = None
+
+    def position_size(self, entry_price: float, stop_price: float) -> int:
+        # === То же правило, что и CalculatePositionSize ===
+        stop_distance = abs(entry_price - stop_price)
+        if stop_distance == 0:
+            return 0
+        return max(floor(self.equity * self.risk / stop_distance), 0)